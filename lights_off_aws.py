@@ -11,47 +11,52 @@ Bundle for AWS Lambda:
 import os
 import logging
 import datetime
+import time
+import calendar
+import functools
 import re
 import json
 import random
-import collections
+import itertools
+import concurrent.futures
 import botocore
+import botocore.config
 import boto3
 
-logging.getLogger().setLevel(os.environ.get("LOG_LEVEL", logging.ERROR))
-
-SCHED_DELIMS = r"\ +"  # Exposed space must be escaped for re.VERBOSE
-SCHED_TERMS = rf"([^ ]+{SCHED_DELIMS})*"  # Unescaped space inside class
-SCHED_REGEXP_STRFTIME_FMT = (rf"""
-  (^|{SCHED_DELIMS})
-  (
-    # Specific monthly or weekly day and time, or...
-    (dTH:M=%d|uTH:M=%u)T%H:%M
-  |
-    # Day wildcard, specific day, or specific weekday, any other terms, and...
-    (d=(_|%d)|u=%u){SCHED_DELIMS}{SCHED_TERMS}
-    (
-      # Specific daily time, or...
-      H:M=%H:%M
-    |
-      # Hour wildcard or specific hour, any other terms, and specific minute.
-      H=(_|%H){SCHED_DELIMS}{SCHED_TERMS}M=%M
-    )
-  )
-  ({SCHED_DELIMS}|$)
-""")
+LOGGER = logging.getLogger()
+LOGGER.setLevel(os.environ.get("LOG_LEVEL", logging.ERROR))
+
+SCHED_DELIM = " "
+SCHED_TERMS_STRFTIME_FMTS = {
+  # Specific monthly or weekly day and time
+  "day_time": ("dTH:M=%dT%H:%M", "uTH:M=%uT%H:%M"),
+  # Day wildcard, specific day, or specific weekday
+  "day": ("d=_", "d=%d", "u=%u"),
+  # Specific daily time
+  "time": ("H:M=%H:%M", ),
+  # Hour wildcard or specific hour
+  "hour": ("H=_", "H=%H"),
+  # Specific minute
+  "minute": ("M=%M", ),
+}
 
 QUEUE_URL = os.environ.get("QUEUE_URL", "")
 QUEUE_MSG_BYTES_MAX = int(os.environ.get("QUEUE_MSG_BYTES_MAX", "-1"))
 QUEUE_MSG_FMT_VERSION = "01"
+QUEUE_BATCH_MSGS_MAX = 10  # SQS send_message_batch limits
+QUEUE_BATCH_BYTES_MAX = 262144  # 256 KiB
 
 TAG_KEY_PREFIX = "sched"
 TAG_KEY_DELIM = "-"
-TAG_KEYS_NEVER_COPY_REGEXP = (
-  rf"^((aws|ec2|rds):|{TAG_KEY_PREFIX}{TAG_KEY_DELIM})"
+TAG_KEYS_NEVER_COPY_PREFIXES = (
+  "aws:", "ec2:", "rds:", f"{TAG_KEY_PREFIX}{TAG_KEY_DELIM}"
 )
 COPY_TAGS = (os.environ.get("COPY_TAGS", "").lower() == "true")
 
+# Reusable encoders (thread-safe); message bodies omit optional whitespace
+JSON_ENCODER_LOG = json.JSONEncoder(default=str)
+JSON_ENCODER_MSG_BODY = json.JSONEncoder(separators=(",", ":"))
+
 
 # 1. Custom Exceptions #######################################################
 
@@ -75,6 +80,51 @@ def cycle_start_end(datetime_in, cycle_minutes=10, cutoff_minutes=9):
   return (cycle_start, cycle_cutoff)
 
 
+def sched_terms_get(cycle_start):
+  """Take a cycle start datetime, return sets of matching terms, by term type
+  """
+  return {
+    term_type: frozenset(cycle_start.strftime(fmt) for fmt in fmts)
+    for (term_type, fmts) in SCHED_TERMS_STRFTIME_FMTS.items()
+  }
+
+
+def sched_match(sched_terms, sched_str):
+  """Take term sets from sched_terms_get and a schedule, return True if match
+
+  A match requires a day and time term, or else a day term followed (not
+  necessarily immediately) by a time term, or by an hour term followed by a
+  minute term. Terms are separated by one or more spaces.
+  """
+  day_found = False
+  hour_found = False
+  for term in sched_str.split(SCHED_DELIM):
+    if term in sched_terms["day_time"]:
+      return True
+    if day_found:
+      if term in sched_terms["time"]:
+        return True
+      if hour_found and term in sched_terms["minute"]:
+        return True
+      if term in sched_terms["hour"]:
+        hour_found = True
+    elif term in sched_terms["day"]:
+      day_found = True
+  return False
+
+
+def sched_matcher_get(sched_terms):
+  """Take term sets from sched_terms_get, return a memoized match function
+
+  Many resources share schedule strings. Create once per cycle (the cache
+  is thread-safe) so that each distinct schedule is parsed only once.
+  """
+  return functools.lru_cache(maxsize=None)(
+    functools.partial(sched_match, sched_terms)
+  )
+
+
+@functools.lru_cache(maxsize=None)
 def tag_key_join(tag_key_words):
   """Take a tuple of strings, add a prefix, join, and return a tag key
   """
@@ -90,7 +140,7 @@ def unique_suffix(
 ):
   """Return a string of random characters
   """
-  return "".join(random.choice(chars_allowed) for dummy in range(char_count))
+  return "".join(random.choices(chars_allowed, k=char_count))
 
 
 def msg_attrs_str_encode(attr_pairs):
@@ -104,65 +154,85 @@ def msg_attrs_str_encode(attr_pairs):
   }
 
 
-def msg_attr_str_decode(msg, attr_name):
-  """Take an SQS message, return value of a string attribute (must be present)
+def msg_attr_str_decode(msg_attrs, attr_name):
+  """Take an SQS message's attributes, return a string attribute's value
+
+  The attribute must be present.
+  """
+  return msg_attrs[attr_name]["stringValue"]
+
+
+def str_len_utf8(str_in):
+  """Take a string, return its length in bytes, once encoded as UTF-8
+
+  Avoids encoding (and allocating a copy of) ASCII strings
+  """
+  return len(str_in) if str_in.isascii() else len(str_in.encode("utf-8"))
+
+
+def msg_attrs_len(msg_attrs):
+  """Take an SQS messageAttributes dict, return its length in bytes
+
+  String attributes only!
   """
-  return msg["messageAttributes"][attr_name]["stringValue"]
+  return sum(
+    str_len_utf8(attr_name)
+    + str_len_utf8(attr["DataType"])
+    + str_len_utf8(attr["StringValue"])
+    for (attr_name, attr) in msg_attrs.items()
+  )
 
 
 def msg_body_encode(msg_in):
   """Take an SQS queue message body dict, convert to JSON and check length
+
+  Returns the JSON string and its length in bytes
   """
-  msg_out = json.dumps(msg_in)
-  msg_out_len = len(bytes(msg_out, "utf-8"))
+  msg_out = JSON_ENCODER_MSG_BODY.encode(msg_in)
+  msg_out_len = len(msg_out)  # ensure_ascii: 1 byte per character
   if msg_out_len > QUEUE_MSG_BYTES_MAX:
     raise SQSMessageTooLong(
       f"JSON string too long: {msg_out_len} bytes exceeds "
       f"{QUEUE_MSG_BYTES_MAX} bytes; increase QueueMessageBytesMax "
       "CloudFormation parameter"
     )
-  return msg_out
+  return (msg_out, msg_out_len)
 
 
-def sqs_send_log(msg_attrs, msg_body, resp=None, exception=None):
-  """Log SQS send_message attempt at appropriate level
+def log(log_level, log_entry):
+  """Log a dict as JSON, skipping serialization if log_level is filtered out
+  """
+  if LOGGER.isEnabledFor(log_level):
+    LOGGER.log(log_level, JSON_ENCODER_LOG.encode(log_entry))
+
+
+def sqs_send_log(msg_attrs, msg_body, exception=None, log_level=logging.INFO):
+  """Log SQS message send attempt at appropriate level
+
+  exception can also be a message's item from the Failed list in a
+  send_message_batch response. Log the response itself once per batch.
   """
-  log_level = logging.INFO
   if exception is not None:
     log_level = logging.ERROR
-    logging.log(
-      log_level,
-      json.dumps({"type": "EXCEPTION", "exception": exception}, default=str)
-    )
-  if resp is not None:
-    if not boto3_success(resp):
-      log_level = logging.ERROR
-    logging.log(
-      log_level,
-      json.dumps({"type": "AWS_RESPONSE", "aws_response": resp}, default=str)
-    )
-  logging.log(
+    log(log_level, {"type": "EXCEPTION", "exception": exception})
+  log(
     log_level,
-    json.dumps(
-      {"type": "SQS_MSG", "msg_attrs": msg_attrs, "msg_body": msg_body},
-      default=str
-  ))
+    {"type": "SQS_MSG", "msg_attrs": msg_attrs, "msg_body": msg_body}
+  )
 
 
 def op_log(event, resp=None, log_level=logging.ERROR):
   """Log Lambda function event and AWS SDK method call response
   """
-  logging.log(
-    log_level,
-    json.dumps({"type": "LAMBDA_EVENT", "lambda_event": event}, default=str)
-  )
+  log(log_level, {"type": "LAMBDA_EVENT", "lambda_event": event})
   if resp is not None:
-    logging.log(
-      log_level,
-      json.dumps({"type": "AWS_RESPONSE", "aws_response": resp}, default=str)
-    )
+    log(log_level, {"type": "AWS_RESPONSE", "aws_response": resp})
 
 
+BOTO3_CONFIG = botocore.config.Config(
+  tcp_keepalive=True,  # Reuse connections across many SQS/operation calls
+  retries={"mode": "adaptive", "max_attempts": 5},
+)
 svc_clients = {}
 
 
@@ -170,13 +240,26 @@ def svc_client_get(svc):
   """Take an AWS service, return a boto3 client, creating it if needed
   """
   if svc_clients.get(svc, None) is None:
-    svc_clients[svc] = boto3.client(svc)
+    svc_clients[svc] = boto3.client(svc, config=BOTO3_CONFIG)
     # boto3 method references can only be resolved at run-time,
     # against an instance of an AWS service's Client class.
     # http://boto3.readthedocs.io/en/latest/guide/events.html#extensibility-guide
   return svc_clients[svc]
 
 
+def svc_clients_init(svcs):
+  """Take AWS services, create boto3 clients in advance
+
+  If no AWS region is configured (outside AWS Lambda), defers creation to
+  first use, so that this module can still be imported
+  """
+  try:
+    for svc in svcs:
+      svc_client_get(svc)
+  except botocore.exceptions.NoRegionError:
+    pass
+
+
 def boto3_success(resp):
   """Take a boto3 response, return True if result was success
 
@@ -184,11 +267,10 @@ def boto3_success(resp):
   complete; it may take hours for an image or snapshot to become available.
   Checking completion is left to other tools.
   """
-  return all([
-    isinstance(resp, dict),
-    isinstance(resp.get("ResponseMetadata", None), dict),
-    resp["ResponseMetadata"].get("HTTPStatusCode", 0) == 200
-  ])
+  try:
+    return resp["ResponseMetadata"]["HTTPStatusCode"] == 200
+  except (KeyError, TypeError):
+    return False
 
 # 3. Custom Classes ##########################################################
 
@@ -223,38 +305,44 @@ class AWSRsrcType():
 class AWSChildRsrcType(AWSRsrcType):
   """AWS child resource type, supporting creation operation
   """
-  members = collections.defaultdict(dict)
+  members = {}
 
   def __init__(self, svc, rsrc_type_words, rsrc_id_key_suffix, **kwargs):
     super().__init__(svc, rsrc_type_words, rsrc_id_key_suffix)
     self.name_chars_max = kwargs["name_chars_max"]
-    self.name_chars_unsafe_regexp = kwargs.get("name_chars_unsafe_regexp", "")
+    name_chars_unsafe_regexp = kwargs.get("name_chars_unsafe_regexp", "")
+    self.name_chars_unsafe_regexp = (
+      re.compile(name_chars_unsafe_regexp) if name_chars_unsafe_regexp
+      else None
+    )
     self.create_kwargs = kwargs["create_kwargs"]
-    self.__class__.members[svc][self.rsrc_key] = self  # Register self!
+    # Register self!
+    self.__class__.members.setdefault(svc, {})[self.rsrc_key] = self
 
 
 class AWSParentRsrcType(AWSRsrcType):
   """AWS parent resource type, supporting various operations
   """
-  members = collections.defaultdict(dict)
+  members = {}
+  members_all = []  # Flat, for iteration
 
   def __init__(self, svc, rsrc_type_words, rsrc_id_key_suffix, **kwargs):
     super().__init__(svc, rsrc_type_words, rsrc_id_key_suffix)
     self.describe_method_name = f"describe_{self.rsrc_type_in_methods}s"
     self.status_filter_pair = kwargs.get("status_filter_pair", ())
     self.describe_flatten = kwargs.get("describe_flatten", None)
+    self.tags_key = kwargs.get("tags_key", "Tags")
     self.ops = {}
     for (op_tag_key_words, op_properties) in kwargs["ops"].items():
       AWSOp.new(self, op_tag_key_words, **op_properties)
-    self.__class__.members[svc][self.rsrc_key] = self  # Register self!
+    self.ops_tag_keys = frozenset(self.ops)
+    # Register self!
+    self.__class__.members.setdefault(svc, {})[self.rsrc_key] = self
+    self.__class__.members_all.append(self)
 
   # pylint: disable=missing-function-docstring
 
-  @property
-  def ops_tag_keys(self):
-    return self.ops.keys()
-
-  @property
+  @functools.cached_property
   def describe_filters(self):
     describe_filters_out = []
     if self.status_filter_pair:
@@ -263,7 +351,7 @@ class AWSParentRsrcType(AWSRsrcType):
         describe_filters_out.append(("tag-key", self.ops_tag_keys))
     return describe_filters_out
 
-  @property
+  @functools.cached_property
   def describe_kwargs(self):
     describe_kwargs_out = {}
     if self.describe_filters:
@@ -278,59 +366,74 @@ class AWSParentRsrcType(AWSRsrcType):
     """
     return rsrc[self.rsrc_id_key]
 
-  def rsrc_tags_list(self, rsrc):  # pylint: disable=no-self-use
+  def rsrc_tags_list(self, rsrc):
     """Return a resource's raw-format list of tags
 
-    Currently generic using .get(), but could be specialized by rsrc_type
-
-    Key        Services
+    tags_key   Services
     "Tags"     EC2, CloudFormation
     "TagList"  RDS
 
     Key may be omitted if no tags are present
     """
-    return rsrc.get("Tags", rsrc.get("TagList", []))
+    return rsrc.get(self.tags_key, ())
 
-  def op_tags_match(self, rsrc, sched_regexp):
+  def op_tags_match(self, rsrc, sched_matcher):
     """Scan a resource's tags to find operations scheduled for current cycle
     """
-    ops_tag_keys = self.ops_tag_keys
-    op_tags_matched = []
-    for tag_dict in self.rsrc_tags_list(rsrc):
-      tag_key = tag_dict["Key"]
-      if tag_key in ops_tag_keys and sched_regexp.search(tag_dict["Value"]):
-        op_tags_matched.append(tag_key)
-    return op_tags_matched
-
-  def rsrcs_find(self, sched_regexp, cycle_start_str, cycle_cutoff_epoch_str):
+    tags = {
+      tag_dict["Key"]: tag_dict["Value"]
+      for tag_dict in self.rsrc_tags_list(rsrc)
+    }
+    # Scan the (usually smaller) set of operation tag keys, not all tags;
+    # skips schedule parsing if no operation tags present
+    op_tag_keys = [
+      tag_key for tag_key in self.ops_tag_keys if tag_key in tags
+    ]
+    if not op_tag_keys:
+      return ()
+    if len(op_tag_keys) > 1:
+      op_tag_keys.sort()  # Stable log output if multiple ops
+    return [
+      tag_key
+      for tag_key in op_tag_keys
+      if sched_matcher(tags[tag_key])
+    ]
+
+  def rsrcs_find(
+    self, sched_matcher, cycle_start_str, cycle_cutoff_epoch_str
+  ):
     """Find parent resources to operate on, and send details to queue
     """
     paginator = svc_client_get(self.svc).get_paginator(
       self.describe_method_name
     )
-    for resp in paginator.paginate(**self.describe_kwargs):
-      if self.describe_flatten:
-        rsrcs = self.describe_flatten(resp)
-      else:
-        rsrcs = resp.get(self.rsrcs_key, [])
-      for rsrc in rsrcs:
-        op_tags_matched = self.op_tags_match(rsrc, sched_regexp)
-        op_tags_matched_count = len(op_tags_matched)
-
-        if op_tags_matched_count == 1:
-          op = self.ops[op_tags_matched[0]]
-          op_kwargs = op.op_kwargs(rsrc, cycle_start_str)
-          op.queue(op_kwargs, cycle_cutoff_epoch_str)
-
-        elif op_tags_matched_count > 1:
-          logging.error(json.dumps({
-            "type": "MULTIPLE_OPS",
-            "svc": self.svc,
-            "rsrc_type": self.rsrc_key,
-            "rsrc_id": self.rsrc_id(rsrc),
-            "op_tags_matched": op_tags_matched,
-            "cycle_start_str": cycle_start_str,
-          }))
+    sqs_msg_batch = SQSMsgBatch()
+    try:
+      for resp in paginator.paginate(**self.describe_kwargs):
+        if self.describe_flatten:
+          rsrcs = self.describe_flatten(resp)
+        else:
+          rsrcs = resp.get(self.rsrcs_key, ())
+        for rsrc in rsrcs:
+          op_tags_matched = self.op_tags_match(rsrc, sched_matcher)
+          op_tags_matched_count = len(op_tags_matched)
+
+          if op_tags_matched_count == 1:
+            op = self.ops[op_tags_matched[0]]
+            op_kwargs = op.op_kwargs(rsrc, cycle_start_str)
+            op.queue(op_kwargs, cycle_cutoff_epoch_str, sqs_msg_batch)
+
+          elif op_tags_matched_count > 1:
+            log(logging.ERROR, {
+              "type": "MULTIPLE_OPS",
+              "svc": self.svc,
+              "rsrc_type": self.rsrc_key,
+              "rsrc_id": self.rsrc_id(rsrc),
+              "op_tags_matched": op_tags_matched,
+              "cycle_start_str": cycle_start_str,
+            })
+    finally:
+      sqs_msg_batch.send()  # Operations already found should not be lost
 
 
 class AWSOp():
@@ -344,6 +447,7 @@ class AWSOp():
     self.method_name = f"{verb}_{self.rsrc_type.rsrc_type_in_methods}"
     self.kwargs_static = kwargs.get("kwargs_static", {})
     self.kwargs_dynamic = kwargs.get("kwargs_dynamic", None)
+    self.msg_attrs_cycle = ("", {})  # (cycle_cutoff_epoch_str, msg_attrs)
     self.rsrc_type.ops[self.tag_key] = self  # Register in parent AWSRsrcType!
 
   @staticmethod
@@ -401,32 +505,36 @@ class AWSOp():
       op_kwargs_out.update((self.kwargs_dynamic)(self, rsrc))
     return op_kwargs_out
 
-  def queue(self, op_kwargs, cycle_cutoff_epoch_str):
-    """Send an operation message to the SQS queue
+  @functools.cached_property
+  def msg_attrs_static(self):
+    """Return SQS message attributes that do not vary by cycle
+
+    Computed on first use because subclasses set method_name after
+    AWSOp.__init__ runs
     """
-    op_msg_attrs = msg_attrs_str_encode((
+    return msg_attrs_str_encode((
       ("version", QUEUE_MSG_FMT_VERSION),
-      ("expires", cycle_cutoff_epoch_str),
       ("svc", self.rsrc_type.svc),
       ("op_method_name", self.method_name),
     ))
-    try:
-      sqs_resp = svc_client_get("sqs").send_message(
-        QueueUrl=QUEUE_URL,
-        MessageAttributes=op_msg_attrs,
-        MessageBody=msg_body_encode(op_kwargs),
-      )
-    except (
-      botocore.exceptions.ClientError,
-      SQSMessageTooLong,
-    ) as sqs_exception:
-      sqs_send_log(op_msg_attrs, op_kwargs, exception=sqs_exception)
-      # Usually recoverable, try to queue next operation
-    except Exception:
-      sqs_send_log(op_msg_attrs, op_kwargs)
-      raise  # Unrecoverable, stop queueing operations
-    else:
-      sqs_send_log(op_msg_attrs, op_kwargs, resp=sqs_resp)
+
+  def msg_attrs(self, cycle_cutoff_epoch_str):
+    """Return SQS message attributes, building them once per cycle
+
+    Messages in a batch share the dict; boto3 does not modify it.
+    """
+    (msg_attrs_epoch_str, msg_attrs_out) = self.msg_attrs_cycle
+    if msg_attrs_epoch_str != cycle_cutoff_epoch_str:
+      msg_attrs_out = self.msg_attrs_static | msg_attrs_str_encode((
+        ("expires", cycle_cutoff_epoch_str),
+      ))
+      self.msg_attrs_cycle = (cycle_cutoff_epoch_str, msg_attrs_out)
+    return msg_attrs_out
+
+  def queue(self, op_kwargs, cycle_cutoff_epoch_str, sqs_msg_batch):
+    """Add an operation message to a batch for the SQS queue
+    """
+    sqs_msg_batch.append(self.msg_attrs(cycle_cutoff_epoch_str), op_kwargs)
 
   def __str__(self):
     return f"AWSOp {self.tag_key} {self.rsrc_type.svc}.{self.method_name}"
@@ -452,7 +560,8 @@ class AWSOpChildOut(AWSOp):
   """
   def __init__(self, rsrc_type, tag_key_words, **kwargs):
     verb = "create"
-    super().__init__(rsrc_type, tag_key_words, **(kwargs | {"verb": verb}))
+    kwargs["verb"] = verb  # kwargs is already this call's own dict
+    super().__init__(rsrc_type, tag_key_words, **kwargs)
     self.child_rsrc_type = kwargs["child_rsrc_type"]
     self.method_name = f"{verb}_{self.child_rsrc_type.rsrc_type_in_methods}"
 
@@ -472,16 +581,22 @@ class AWSOpChildOut(AWSOp):
     Child resource name example: zsched-ParentNameOrID-20221101T1450Z-acefg
     Truncate parent portion to spare other parts of child name.
     """
-    child_tags_list = []
-    parent_name_from_tag = ""
-    for parent_tag_dict in self.rsrc_type.rsrc_tags_list(parent_rsrc):
-      parent_tag_key = parent_tag_dict["Key"]
-      if parent_tag_key == "Name":
-        parent_name_from_tag = parent_tag_dict["Value"]
-        if not COPY_TAGS:
-          break  # Stop as soon as Name tag has been found
-      elif not re.match(TAG_KEYS_NEVER_COPY_REGEXP, parent_tag_key):
-        child_tags_list.append(parent_tag_dict)
+    parent_tags_list = self.rsrc_type.rsrc_tags_list(parent_rsrc)
+    parent_name_from_tag = next(
+      (
+        parent_tag_dict["Value"]
+        for parent_tag_dict in parent_tags_list
+        if parent_tag_dict["Key"] == "Name"
+      ),
+      ""
+    )  # Stops as soon as Name tag has been found
+    # If COPY_TAGS is off, copy no parent tags at all (child gets its own Name)
+    child_tags_list = [
+      parent_tag_dict
+      for parent_tag_dict in parent_tags_list
+      if parent_tag_dict["Key"] != "Name"
+      and not parent_tag_dict["Key"].startswith(TAG_KEYS_NEVER_COPY_PREFIXES)
+    ] if COPY_TAGS else []
 
     parent_id = self.rsrc_type.rsrc_id(parent_rsrc)
     parent_name = parent_name_from_tag if parent_name_from_tag else parent_id
@@ -494,10 +609,9 @@ class AWSOpChildOut(AWSOp):
     child_name = name_delim.join([
       child_name_prefix, parent_name, cycle_start_str, unique_suffix()
     ])
-    if self.child_rsrc_type.name_chars_unsafe_regexp:
-      child_name = re.sub(
-        self.child_rsrc_type.name_chars_unsafe_regexp, fill_char, child_name
-      )
+    name_chars_unsafe_regexp = self.child_rsrc_type.name_chars_unsafe_regexp
+    if name_chars_unsafe_regexp:
+      child_name = name_chars_unsafe_regexp.sub(fill_char, child_name)
 
     for (child_tag_key, child_tag_value) in (
       ("Name", child_name),  # Shown in EC2 Console / searchable in any service
@@ -518,6 +632,82 @@ class AWSOpChildOut(AWSOp):
     return op_kwargs_out
 
 
+class SQSMsgBatch():
+  """Batch of SQS queue messages, to be sent with one send_message_batch call
+
+  The batch is sent automatically when it fills up. Call send() after adding
+  the last message.
+  """
+  def __init__(self):
+    self.entries = []
+    self.msg_bodies = []  # Original message body dicts, for logging
+    self.msgs_len = 0
+
+  def append(self, msg_attrs, msg_body):
+    """Add a message to the batch, sending the batch first if message won't fit
+    """
+    try:
+      (msg_body_out, msg_body_out_len) = msg_body_encode(msg_body)
+    except SQSMessageTooLong as sqs_exception:
+      sqs_send_log(msg_attrs, msg_body, exception=sqs_exception)
+      return  # Recoverable, try to queue next operation
+    except Exception:
+      sqs_send_log(msg_attrs, msg_body)
+      raise  # Unrecoverable, stop queueing operations
+    msg_len = msg_attrs_len(msg_attrs) + msg_body_out_len
+    if self.msgs_len + msg_len > QUEUE_BATCH_BYTES_MAX:
+      self.send()
+    self.entries.append({
+      "Id": str(len(self.entries)),  # Unique within batch
+      "MessageAttributes": msg_attrs,
+      "MessageBody": msg_body_out,
+    })
+    self.msg_bodies.append(msg_body)
+    self.msgs_len += msg_len
+    if len(self.entries) >= QUEUE_BATCH_MSGS_MAX:
+      self.send()
+
+  def send(self):
+    """Send any messages in the batch, log outcomes, and empty the batch
+    """
+    if not self.entries:
+      return
+    entries = self.entries
+    msg_bodies = self.msg_bodies
+    self.entries = []  # Empty batch now, in case of an exception
+    self.msg_bodies = []
+    self.msgs_len = 0
+    try:
+      sqs_resp = svc_client_get("sqs").send_message_batch(
+        QueueUrl=QUEUE_URL,
+        Entries=entries,
+      )
+    except botocore.exceptions.ClientError as sqs_exception:
+      for (entry, msg_body) in zip(entries, msg_bodies):
+        sqs_send_log(
+          entry["MessageAttributes"], msg_body, exception=sqs_exception
+        )
+      # Usually recoverable, try to queue next batch
+    except Exception:
+      for (entry, msg_body) in zip(entries, msg_bodies):
+        sqs_send_log(entry["MessageAttributes"], msg_body)
+      raise  # Unrecoverable, stop queueing operations
+    else:
+      log_level = logging.INFO if boto3_success(sqs_resp) else logging.ERROR
+      log(log_level, {"type": "AWS_RESPONSE", "aws_response": sqs_resp})
+      sqs_resp_failed = {
+        sqs_resp_failed_entry["Id"]: sqs_resp_failed_entry
+        for sqs_resp_failed_entry in sqs_resp.get("Failed", [])
+      }
+      for (entry, msg_body) in zip(entries, msg_bodies):
+        sqs_send_log(
+          entry["MessageAttributes"],
+          msg_body,
+          exception=sqs_resp_failed.get(entry["Id"], None),
+          log_level=log_level
+        )
+
+
 # 4. Data-Driven Specifications ##############################################
 
 
@@ -589,10 +779,9 @@ def rsrc_types_init():
       status_filter_pair=(
         "instance-state-name", ("running", "stopping", "stopped")
       ),
-      describe_flatten=lambda resp: (
-        instance
+      describe_flatten=lambda resp: itertools.chain.from_iterable(
+        reservation.get("Instances", [])
         for reservation in resp.get("Reservations", [])
-        for instance in reservation.get("Instances", [])
       ),
       ops={
         ("start", ): {"class": AWSOpMultipleIn},
@@ -629,6 +818,7 @@ def rsrc_types_init():
       "rds",
       ("DB", "Instance"),
       "Identifier",
+      tags_key="TagList",
       ops={
         ("start", ): {},
         ("stop", ): {},
@@ -644,6 +834,7 @@ def rsrc_types_init():
       "rds",
       ("DB", "Cluster"),
       "Identifier",
+      tags_key="TagList",
       ops={
         ("start", ): {},
         ("stop", ): {},
@@ -672,33 +863,65 @@ def rsrc_types_init():
     )
 
 
+# Initialize when AWS Lambda loads this module, once per execution environment
+# rather than during an invocation. Only the Find function (the only one with
+# QUEUE_URL set) pre-creates clients; each Do invocation needs just one client,
+# and Do scales out, so it creates that one lazily.
+rsrc_types_init()
+if QUEUE_URL:
+  svc_clients_init(list(AWSParentRsrcType.members) + ["sqs"])
+
 # 5. Find Resources Lambda Function Handler ##################################
 
 
 def lambda_handler_find(event, context):  # pylint: disable=unused-argument
   """Find and queue AWS resources for scheduled operations, based on tags
   """
-  logging.info(
-    json.dumps({"type": "LAMBDA_EVENT", "lambda_event": event}, default=str)
-  )
+  log(logging.INFO, {"type": "LAMBDA_EVENT", "lambda_event": event})
   (cycle_start, cycle_cutoff) = cycle_start_end(
     datetime.datetime.now(datetime.timezone.utc)
   )
   cycle_start_str = cycle_start.strftime("%Y%m%dT%H%MZ")
-  cycle_cutoff_epoch_str = str(int(cycle_cutoff.timestamp()))
-  sched_regexp = re.compile(
-    cycle_start.strftime(SCHED_REGEXP_STRFTIME_FMT), re.VERBOSE
-  )
-  logging.info(json.dumps({"type": "START", "cycle_start": cycle_start_str}))
-  logging.info(json.dumps(
-    {"type": "SCHED_REGEXP_VERBOSE", "sched_regexp": sched_regexp.pattern}
-  ))
-  rsrc_types_init()
-  for rsrc_types in AWSParentRsrcType.members.values():
-    for rsrc_type in rsrc_types.values():
-      rsrc_type.rsrcs_find(
-        sched_regexp, cycle_start_str, cycle_cutoff_epoch_str
+  cycle_cutoff_epoch_str = str(calendar.timegm(cycle_cutoff.utctimetuple()))
+  sched_terms = sched_terms_get(cycle_start)
+  log(logging.INFO, {"type": "START", "cycle_start": cycle_start_str})
+  sched_terms_sorted = {
+    term_type: sorted(terms) for (term_type, terms) in sched_terms.items()
+  }
+  log(logging.INFO, {"type": "SCHED_TERMS", "sched_terms": sched_terms_sorted})
+  sched_matcher = sched_matcher_get(sched_terms)
+  # Describe calls block on network I/O and resource types are independent.
+  # Clients already exist (creation is not thread-safe) and each rsrcs_find
+  # call sends its own queue message batches.
+  with concurrent.futures.ThreadPoolExecutor(
+    max_workers=len(AWSParentRsrcType.members_all)
+  ) as executor:
+    rsrcs_find_futures = [
+      (
+        rsrc_type,
+        executor.submit(
+          rsrc_type.rsrcs_find,
+          sched_matcher,
+          cycle_start_str,
+          cycle_cutoff_epoch_str
+        )
       )
+      for rsrc_type in AWSParentRsrcType.members_all
+    ]
+  # Log every resource type's failure, not just the first, then fail
+  rsrcs_find_exceptions = []
+  for (rsrc_type, rsrcs_find_future) in rsrcs_find_futures:
+    rsrcs_find_exception = rsrcs_find_future.exception()
+    if rsrcs_find_exception is not None:
+      log(logging.ERROR, {
+        "type": "EXCEPTION",
+        "svc": rsrc_type.svc,
+        "rsrc_type": rsrc_type.rsrc_key,
+        "exception": rsrcs_find_exception,
+      })
+      rsrcs_find_exceptions.append(rsrcs_find_exception)
+  if rsrcs_find_exceptions:
+    raise rsrcs_find_exceptions[0]
 
 # 6. "Do" Operations Lambda Function Handler #################################
 
@@ -706,22 +929,21 @@ def lambda_handler_find(event, context):  # pylint: disable=unused-argument
 def lambda_handler_do(event, context):  # pylint: disable=unused-argument
   """Perform a queued operation on an AWS resource
   """
+  now_epoch = int(time.time())
   for msg in event.get("Records", []):  # 0 or 1 messages expected
-    if msg_attr_str_decode(msg, "version") != QUEUE_MSG_FMT_VERSION:
+    msg_attrs = msg["messageAttributes"]
+    if msg_attr_str_decode(msg_attrs, "version") != QUEUE_MSG_FMT_VERSION:
       op_log(event)
       raise RuntimeError("Unrecognized queue message format")
-    if (
-      int(msg_attr_str_decode(msg, "expires"))
-      < int(datetime.datetime.now(datetime.timezone.utc).timestamp())
-    ):
+    if int(msg_attr_str_decode(msg_attrs, "expires")) < now_epoch:
       op_log(event)
       raise RuntimeError(
         "Late; schedule fewer operations per 10-minute cycle, or increase "
         "DoLambdaFnReservedConcurrentExecutions CloudFormation parameter"
       )
 
-    svc = msg_attr_str_decode(msg, "svc")
-    op_method_name = msg_attr_str_decode(msg, "op_method_name")
+    svc = msg_attr_str_decode(msg_attrs, "svc")
+    op_method_name = msg_attr_str_decode(msg_attrs, "op_method_name")
     op_kwargs = json.loads(msg["body"])
     try:
       op_method = getattr(svc_client_get(svc), op_method_name)